@@ -0,0 +1,127 @@
+"""
+Compares decoding a get-torrents response in one piece, as `response.json()` did,
+with `TorrentStreamParser`, including the jsonpickle encode the producer does
+before publishing.
+
+The payload mimics a long running show on EZTV: every field the API returns, with
+realistic lengths, split into the 64 KiB chunks httpx hands to `aiter_bytes`. CPU
+time is the mean over `--repeat` runs. Peak memory is measured with tracemalloc
+on a separate run and covers everything allocated after the body has arrived.
+
+The parser decodes with orjson when the `fast` extra is installed and with
+`json.loads` otherwise. The backend that was measured is printed with the
+results. The one piece `json.loads` baseline always uses the standard library, as
+`response.json()` did.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_jsonstream.py [--torrents 5000]
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+import jsonpickle
+
+from scrapers.scrapers.eztv import TORRENT_FIELDS
+from scrapers.util import jsonstream
+from scrapers.util.jsonstream import TorrentStreamParser
+
+CHUNK_SIZE = 65536
+
+
+def make_payload(count: int) -> bytes:
+    rng = random.Random(0)
+    groups = ["ETTV", "TGx", "MiNX", "FENiX", "SuccessfulCrab", "NTb", "KOGi"]
+    qualities = ["480p", "720p", "1080p", "2160p"]
+
+    torrents = []
+    for i in range(count):
+        season, episode = divmod(i, 24)
+        quality = rng.choice(qualities)
+        group = rng.choice(groups)
+        name = f"The.Example.Show.S{season + 1:02d}E{episode + 1:02d}.{quality}.WEB.h264-{group}"
+        info_hash = f"{rng.getrandbits(160):040x}"
+        torrents.append(
+            {
+                "id": 2_000_000 + i,
+                "hash": info_hash,
+                "filename": f"{name}[EZTVx.to].mkv",
+                "episode_url": f"https://eztvx.to/ep/{2_000_000 + i}/{name.lower().replace('.', '-')}/",
+                "torrent_url": f"https://zoink.ch/torrent/{name}[eztvx.to].mkv.torrent",
+                "magnet_url": f"magnet:?xt=urn:btih:{info_hash}&dn={name}%5Beztvx.to%5D&tr=udp%3A%2F%2Ftracker.opentrackr.org%3A1337%2Fannounce&tr=udp%3A%2F%2Fopen.demonii.com%3A1337%2Fannounce",
+                "title": f"{name.replace('.', ' ')} EZTV",
+                "imdb_id": "6048596",
+                "season": str(season + 1),
+                "episode": str(episode + 1),
+                "small_screenshot": f"//ezimg.ch/thumbs/{name.lower()}-small.jpg",
+                "large_screenshot": f"//ezimg.ch/thumbs/{name.lower()}-large.jpg",
+                "seeds": rng.randint(0, 3000),
+                "peers": rng.randint(0, 500),
+                "date_released_unix": 1_500_000_000 + i * 86400,
+                "size_bytes": str(rng.randint(200_000_000, 8_000_000_000)),
+            }
+        )
+
+    return json.dumps(
+        {
+            "imdb_id": "6048596",
+            "torrents_count": count,
+            "limit": count,
+            "page": 1,
+            "torrents": torrents,
+        }
+    ).encode()
+
+
+def whole(chunks: list[bytes]) -> str:
+    api_data = json.loads(b"".join(chunks).decode())
+    return jsonpickle.encode(api_data["torrents"])
+
+
+def streamed(chunks: list[bytes]) -> str:
+    parser = TorrentStreamParser(TORRENT_FIELDS)
+    torrents = []
+    for chunk in chunks:
+        torrents.extend(parser.feed(chunk))
+    parser.close()
+    return jsonpickle.encode(torrents)
+
+
+def measure(function, chunks: list[bytes], repeat: int) -> tuple[float, int]:
+    start = time.process_time()
+    for _ in range(repeat):
+        function(chunks)
+    cpu = (time.process_time() - start) / repeat
+
+    tracemalloc.start()
+    function(chunks)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return cpu, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--torrents", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    raw = make_payload(args.torrents)
+    chunks = [raw[i : i + CHUNK_SIZE] for i in range(0, len(raw), CHUNK_SIZE)]
+    print(
+        f"{args.torrents} torrents, {len(raw) / 2**20:.1f} MiB in {len(chunks)} chunks"
+    )
+
+    print(f"Parser backend: {jsonstream.loads.__module__}")
+    print(f"{'':<20}{'cpu':>10}{'peak memory':>16}")
+    for name, function in [("json.loads", whole), ("TorrentStreamParser", streamed)]:
+        cpu, peak = measure(function, chunks, args.repeat)
+        print(f"{name:<20}{cpu * 1000:>8.1f}ms{peak / 2**20:>12.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Measures what logging costs the event loop thread on the scraper's hot path.
+
+Each case sets logging up the same way `main.py` does, with stderr pointed at
+/dev/null, then times a burst of `logger.debug` calls shaped like the ones in
+`knightcrawler.produce`. "call" is the time spent in the logging calls themselves,
+which is what blocks the loop. "drain" is how long the enqueue thread then needs to
+write everything out.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_logging.py [--lines 100000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from loguru import logger
+
+from scrapers import logging
+from scrapers.util.config import config
+
+
+def run_case(level: str, rate_limit: int, lines: int) -> tuple[float, float]:
+    config.log_rate_limit_per_site = rate_limit
+    logging.init(level, "producer")
+
+    url = "https://eztv.re/shows/1234/example-show/"
+    start = time.perf_counter()
+    for i in range(lines):
+        logger.debug("Scraping {} from {} ({} torrents)", url, "eztv", i)
+    called = time.perf_counter()
+    logger.complete()
+    drained = time.perf_counter()
+
+    logger.remove()
+    return called - start, drained - called
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=100_000)
+    args = parser.parse_args()
+
+    config.debug_mode = False
+    stderr = sys.stderr
+    cases = [
+        ("INFO", 10),
+        ("DEBUG", 10),
+        ("DEBUG", 0),
+    ]
+
+    results = []
+    with open(os.devnull, "w") as devnull:
+        sys.stderr = devnull
+        try:
+            for level, rate_limit in cases:
+                results.append(
+                    (level, rate_limit, *run_case(level, rate_limit, args.lines))
+                )
+        finally:
+            sys.stderr = stderr
+
+    print(f"{args.lines} debug lines from one site")
+    print(f"{'level':<8}{'rate limit':>12}{'call':>12}{'per line':>12}{'drain':>12}")
+    for level, rate_limit, called, drained in results:
+        limit = f"{rate_limit}/s" if rate_limit else "off"
+        print(
+            f"{level:<8}{limit:>12}{called:>11.3f}s{called / args.lines * 1e6:>10.2f}us{drained:>11.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Compares the throughput of the AMQP and Postgres transports.
+
+Consumers are started first, as they are in a deployment, then one producer
+publishes `--shows` scraped shows of `--torrents` torrents each and the end marker.
+The handler does nothing, so the numbers are the cost of the transport alone:
+encoding, the round trips to the broker or database, and for Postgres the claim
+and delete of every batch.
+
+RabbitMQ and Postgres are reached with the same settings as the scrapers
+(`RABBIT_URI`, `POSTGRES_*`, `WORK_QUEUE_TABLE`, `BATCH_SIZE`). Everything runs on
+its own queue, which is removed again afterwards.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_transport.py [--shows 2000] [--consumers 4]
+"""
+
+import argparse
+import asyncio
+import time
+
+import aio_pika
+
+from scrapers.transports.amqp import AmqpTransport
+from scrapers.transports.base import Transport
+from scrapers.transports.postgres import PostgresTransport
+from scrapers.util.config import config
+from scrapers.util.postgres import create_pool
+from scrapers.util.show import Show
+
+QUEUE_NAME = "bench_transport"
+
+
+def make_scraped_show(i: int, torrents: int) -> tuple:
+    show = Show(
+        url=f"/shows/{i}/example-show-{i}/",
+        name=f"Example Show {i}",
+        status="Airing: Mondays",
+        imdbid=f"{i:07d}",
+    )
+    records = [
+        {
+            "title": f"Example Show {i} S01E{episode:02d} 1080p WEB h264-GRP EZTV",
+            "info_hash": f"{i * 1000 + episode:040X}",
+            "size": 1_500_000_000 + episode,
+            "seeders": episode * 3,
+            "leechers": episode,
+        }
+        for episode in range(torrents)
+    ]
+    return (show, "eztv", records)
+
+
+async def run(
+    create_transport, consumers: int, shows: list[tuple], postgres_pool=None
+) -> tuple[float, float]:
+    consumed = 0
+
+    async def handler(scraped_show, postgres):
+        nonlocal consumed
+        consumed += 1
+
+    async def completed(scraped_show):
+        pass
+
+    async def consume():
+        async with create_transport() as transport:
+            await transport.consume(handler, completed, postgres_pool)
+
+    async with create_transport() as producer:
+        await producer.publish_start()
+        consumer_tasks = [asyncio.create_task(consume()) for _ in range(consumers)]
+        # Let the consumers connect and go idle
+        await asyncio.sleep(1)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(producer.publish(show) for show in shows))
+        await producer.publish_end()
+        published = time.perf_counter()
+        await asyncio.gather(*consumer_tasks)
+        finished = time.perf_counter()
+
+    assert consumed == len(shows), f"consumed {consumed} of {len(shows)} shows"
+    return published - start, finished - start
+
+
+async def bench_amqp(consumers: int, shows: list[tuple]) -> tuple[float, float]:
+    loop = asyncio.get_running_loop()
+
+    def create_transport() -> Transport:
+        return AmqpTransport(QUEUE_NAME, loop)
+
+    try:
+        return await run(create_transport, consumers, shows)
+    finally:
+        # The last consumer puts the kill signal back, drop it with the queue
+        async with await aio_pika.connect_robust(config.rabbit_uri) as connection:
+            channel = await connection.channel()
+            await channel.queue_delete(QUEUE_NAME)
+
+
+async def bench_postgres(consumers: int, shows: list[tuple]) -> tuple[float, float]:
+    async with create_pool() as postgres_pool:
+
+        def create_transport() -> Transport:
+            return PostgresTransport(QUEUE_NAME, postgres_pool)
+
+        try:
+            return await run(create_transport, consumers, shows, postgres_pool)
+        finally:
+            await postgres_pool.execute(
+                f"DELETE FROM {config.work_queue_table} WHERE queue = $1", QUEUE_NAME
+            )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shows", type=int, default=2000)
+    parser.add_argument("--torrents", type=int, default=50)
+    parser.add_argument("--consumers", type=int, default=4)
+    parser.add_argument(
+        "--transport", choices=["amqp", "postgres", "both"], default="both"
+    )
+    args = parser.parse_args()
+
+    shows = [make_scraped_show(i, args.torrents) for i in range(args.shows)]
+    benches = {"amqp": bench_amqp, "postgres": bench_postgres}
+    if args.transport != "both":
+        benches = {args.transport: benches[args.transport]}
+
+    print(
+        f"{args.shows} shows of {args.torrents} torrents, {args.consumers} consumers, batch size {config.batch_size}"
+    )
+    print(f"{'transport':<12}{'publish':>12}{'end to end':>14}{'shows/s':>12}")
+    for name, bench in benches.items():
+        published, finished = await bench(args.consumers, shows)
+        print(
+            f"{name:<12}{published:>11.2f}s{finished:>13.2f}s{args.shows / finished:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
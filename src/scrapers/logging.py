@@ -1,11 +1,94 @@
+import atexit
 import sys
+import time
 
 from loguru import logger
 
 from scrapers.util.config import config
 
+# loguru's default format. The stderr sink builds on it to report suppressed lines.
+_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | "
+    "<level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+)
 
-def init(desired_log_level: str, role: str):
+
+class SiteRateLimiter:
+    """
+    A loguru filter that rate limits repetitive lines per message site (module and
+    line).
+
+    Only levels below WARNING are limited. When a site is allowed to log again, the
+    number of lines that were dropped is added to that line by `format`, so it only
+    shows up in the sink the limiter is attached to. Counts that are still pending
+    when the process exits are logged by `flush`.
+
+    Example usage:
+        limiter = SiteRateLimiter(10)
+        logger.add(sys.stderr, filter=limiter, format=limiter.format)
+        atexit.register(limiter.flush)
+    """
+
+    def __init__(self, per_second: int, max_level: int = 30):
+        self.per_second = per_second
+        self.max_level = max_level
+        # site -> [window start, lines logged, lines suppressed, level name]
+        self._windows: dict[tuple[str, int], list] = {}
+        # id of an accepted record -> lines suppressed before it, read by `format`
+        self._suppressed: dict[int, int] = {}
+
+    def __call__(self, record) -> bool:
+        if record["level"].no >= self.max_level:
+            return True
+
+        site = (record["name"], record["line"])
+        now = time.monotonic()
+        window = self._windows.get(site)
+        if window is None or now - window[0] >= 1:
+            if window is not None and window[2]:
+                self._suppressed[id(record)] = window[2]
+            self._windows[site] = [now, 1, 0, record["level"].name]
+            return True
+
+        if window[1] < self.per_second:
+            window[1] += 1
+            return True
+
+        window[2] += 1
+        return False
+
+    def format(self, record) -> str:
+        # loguru calls this straight after the filter accepted the record
+        suppressed = self._suppressed.pop(id(record), 0)
+        if suppressed:
+            return _FORMAT + f" ({suppressed} similar lines suppressed)\n{{exception}}"
+        return _FORMAT + "\n{exception}"
+
+    def flush(self):
+        """
+        Logs the lines suppressed in each site's last window, which would otherwise
+        only be reported the next time that site logs.
+        """
+        pending = [
+            (site, window) for site, window in self._windows.items() if window[2]
+        ]
+        if not pending:
+            return
+
+        level = max(
+            (window[3] for _, window in pending), key=lambda name: logger.level(name).no
+        )
+        sites = ", ".join(
+            f"{name}:{line} ({window[2]})" for (name, line), window in pending
+        )
+        for _, window in pending:
+            window[2] = 0
+
+        logger.log(level, "Similar lines suppressed before exit: {}", sites)
+
+
+def init(desired_log_level: str, role: str, json_output: bool = False):
     valid_log_levels = [
         "TRACE",
         "DEBUG",
@@ -19,9 +102,36 @@ def init(desired_log_level: str, role: str):
     desired_log_level = desired_log_level.upper()
 
     if desired_log_level not in valid_log_levels:
-        desired_log_level = "DEBUG"
+        desired_log_level = "INFO"
 
     logger.remove()
-    logger.add(sys.stderr, level=desired_log_level)
+    logger.configure(extra={"role": role})
+    # `enqueue` hands records to a background thread, so a slow terminal or disk
+    # never blocks the event loop. `serialize` writes one JSON object per line.
+    if config.log_rate_limit_per_site > 0:
+        limiter = SiteRateLimiter(config.log_rate_limit_per_site)
+        # Runs before loguru's own exit hook, which drains the queue
+        atexit.register(limiter.flush)
+        logger.add(
+            sys.stderr,
+            level=desired_log_level,
+            filter=limiter,
+            format=limiter.format,
+            enqueue=True,
+            serialize=json_output,
+        )
+    else:
+        logger.add(
+            sys.stderr,
+            level=desired_log_level,
+            enqueue=True,
+            serialize=json_output,
+        )
     if config.debug_mode:
-        logger.add("debug_{time}.log", mode="w", level="DEBUG")
+        logger.add(
+            "debug_{time}.log",
+            mode="w",
+            level="DEBUG",
+            enqueue=True,
+            serialize=json_output,
+        )
@@ -1,23 +1,30 @@
 import argparse
 import asyncio
+import contextlib
 
 import sniffio
 from loguru import logger
 
-from scrapers import logging
+from scrapers import logging, profiling
 from scrapers.scrapers import eztv
 from scrapers.services import knightcrawler
+from scrapers.util.config import config
 from scrapers.util.showlist import ShowList
 
 
-async def main(role: str, eztv_showlist_file: str, log_level: str) -> None:
+async def main(
+    role: str, eztv_showlist_file: str, log_level: str, log_json: bool
+) -> None:
     # Set the user log level
-    logging.init(log_level, role)
+    logging.init(log_level, role, json_output=log_json)
 
     eztv_showlist: ShowList = ShowList()
     await eztv_showlist.load_from_file(eztv_showlist_file)
-    await eztv.get_list_of_shows(eztv_showlist, eztv_showlist_file)
-    await eztv_showlist.save_to_file(eztv_showlist_file)
+    showlist_diff = await eztv.get_list_of_shows(eztv_showlist, eztv_showlist_file)
+    if not config.replay_archive:
+        await eztv_showlist.save_to_file(eztv_showlist_file)
+    if showlist_diff is not None:
+        await knightcrawler.rescan_changed_shows(showlist_diff)
 
     if role == "producer":
         await knightcrawler.scrape_eztv(eztv_showlist, loop)
@@ -36,20 +43,60 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--log-level",
-        default="DEBUG",
+        default="INFO",
         help="Defaults to 'INFO'. Warning `DEBUG` is very verbose.",
     )
+    parser.add_argument(
+        "--log-json",
+        action="store_true",
+        default=config.log_json,
+        help="Write logs as one JSON object per line.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the run and log anything that blocks the event loop. A report is written on exit.",
+    )
+    parser.add_argument(
+        "--slow-callbacks",
+        action="store_true",
+        help="Log every callback that holds the event loop for longer than SLOW_CALLBACK_THRESHOLD. Turns on asyncio debug mode, which is slow.",
+    )
+    archive_group = parser.add_mutually_exclusive_group()
+    archive_group.add_argument(
+        "--record",
+        metavar="ARCHIVE",
+        help="Save every fetched response to the ARCHIVE directory.",
+    )
+    archive_group.add_argument(
+        "--replay",
+        metavar="ARCHIVE",
+        help="Serve every request from the ARCHIVE directory instead of the network, without rate limiting. Every show is scraped again, the showlist and the processed list are left untouched, start consumers with `--replay` as well.",
+    )
     # parser.add_argument(
     #     "--debug",
     #     default=False,
     #     help="Defaults to 'INFO'. Warning `DEBUG` is very verbose.",
     # )
     args = parser.parse_args()
+    if args.record:
+        config.record_archive = args.record
+    if args.replay:
+        config.replay_archive = args.replay
+
     loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+    if args.slow_callbacks:
+        profiling.enable_slow_callback_detection(loop, config.slow_callback_threshold)
+    profiler = (
+        profiling.Profiler(args.role, loop)
+        if args.profile
+        else contextlib.nullcontext()
+    )
     try:
-        loop.run_until_complete(
-            main(args.role, args.eztv_showlist_file, args.log_level)
-        )
+        with profiler:
+            loop.run_until_complete(
+                main(args.role, args.eztv_showlist_file, args.log_level, args.log_json)
+            )
     except KeyboardInterrupt:
         logger.info("Received exit signal, exiting")
     except sniffio._impl.AsyncLibraryNotFoundError:
@@ -0,0 +1,206 @@
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+import traceback
+from contextlib import suppress
+from typing import Optional
+
+import arrow
+from loguru import logger
+
+from scrapers.util.config import config
+
+
+class _InterceptHandler(logging.Handler):
+    """
+    Forwards records from the standard library `logging` module (used by asyncio for
+    its slow callback warnings) to loguru.
+    """
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+
+        logger.opt(exception=record.exc_info).log(level, record.getMessage())
+
+
+def enable_slow_callback_detection(loop: asyncio.AbstractEventLoop, threshold: float):
+    # asyncio only reports slow callbacks in debug mode. The message names the task
+    # and coroutine that held the loop, e.g.
+    #     Executing <Task ... coro=<ShowList.save_to_file() ...>> took 0.312 seconds
+    # Debug mode records a traceback for every handle and task, which slows the
+    # loop down many times over, so it is kept separate from `Profiler`.
+    loop.set_debug(True)
+    loop.slow_callback_duration = threshold
+
+    asyncio_logger = logging.getLogger("asyncio")
+    asyncio_logger.setLevel(logging.WARNING)
+    asyncio_logger.addHandler(_InterceptHandler())
+
+    logger.info(f"Slow callback detection enabled. Threshold is {threshold}s")
+
+
+class LoopLagProbe:
+    """
+    Periodically measures how late the event loop wakes up a sleeping coroutine.
+
+    A watchdog thread runs alongside the probe and samples the task that is
+    running, and the stack of the loop thread, once the loop is half the threshold
+    late. That is early enough that every stall over the threshold is sampled at
+    least once, however short, so the probe can say what caused the lag it
+    measured. If the loop is still blocked at the threshold the watchdog logs the
+    sample straight away, which catches CPU bound work such as large `json.dumps`
+    calls while it is happening.
+    """
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_lag: float = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._heartbeat: float = time.monotonic()
+        # (heartbeat, task, stack) of the most recent stall
+        self._sample: Optional[tuple[float, Optional[asyncio.Task], str]] = None
+        # Heartbeat of the last stall the watchdog logged itself
+        self._reported_heartbeat: Optional[float] = None
+        self._stopped = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = loop.create_task(self._probe())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-lag-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+
+        if self._task is not None and self._loop is not None:
+            self._task.cancel()
+            # Let the probe see its cancellation if the loop is still usable
+            with suppress(RuntimeError, asyncio.CancelledError):
+                self._loop.run_until_complete(self._task)
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            heartbeat = self._heartbeat
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - expected
+            self._heartbeat = time.monotonic()
+            self.max_lag = max(self.max_lag, lag)
+
+            if lag <= self.threshold:
+                continue
+
+            sample = self._sample
+            if (
+                heartbeat != self._reported_heartbeat
+                and sample is not None
+                and sample[0] == heartbeat
+            ):
+                _, task, stack = sample
+                logger.warning(
+                    f"Event loop lag of {lag:.3f}s detected, {task!r} was running\n{stack}"
+                )
+            else:
+                logger.warning(f"Event loop lag of {lag:.3f}s detected")
+
+    def _watch(self):
+        poll_interval = min(self.threshold, self.interval) / 4
+        while not self._stopped.wait(poll_interval):
+            heartbeat = self._heartbeat
+            late_by = time.monotonic() - heartbeat - self.interval
+            if late_by <= self.threshold / 2 or heartbeat == self._reported_heartbeat:
+                continue
+
+            if self._sample is None or self._sample[0] != heartbeat:
+                self._sample = (heartbeat, *self._describe_loop())
+
+            if late_by > self.threshold:
+                # Only report each stall once
+                self._reported_heartbeat = heartbeat
+                _, task, stack = self._sample
+                logger.warning(
+                    f"Event loop has been blocked for {late_by:.3f}s by {task!r}\n{stack}"
+                )
+
+    def _describe_loop(self) -> tuple[Optional[asyncio.Task], str]:
+        task = None
+        with suppress(RuntimeError):
+            task = asyncio.current_task(self._loop)
+
+        frame = sys._current_frames().get(self._loop_thread_id)  # type: ignore
+        stack = "".join(traceback.format_stack(frame)) if frame else "unavailable"
+
+        return task, stack
+
+
+class Profiler:
+    """
+    Profiles a whole role with cProfile and watches the event loop while it runs.
+
+    asyncio debug mode is left off, so the profile shows the scraper's own work
+    rather than asyncio's debug bookkeeping. `LoopLagProbe` still reports anything
+    that blocks the loop.
+
+    On exit two files are written to the current directory:
+        profile_<role>_<time>.prof  - pstats data, for `snakeviz` or `flameprof`
+        profile_<role>_<time>.txt   - the top functions by cumulative time
+
+    Example usage:
+        with Profiler("producer", loop):
+            loop.run_until_complete(main())
+    """
+
+    def __init__(self, role: str, loop: asyncio.AbstractEventLoop):
+        self.role = role
+        self.loop = loop
+        self._profile = cProfile.Profile()
+        self._lag_probe = LoopLagProbe(
+            config.loop_lag_probe_interval, config.slow_callback_threshold
+        )
+
+    def __enter__(self):
+        if self.loop.get_debug():
+            logger.warning(
+                "asyncio debug mode is on, the profile will include its overhead"
+            )
+        self._lag_probe.start(self.loop)
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profile.disable()
+        self._lag_probe.stop()
+        self.write_report()
+
+    def write_report(self, limit: int = 50):
+        filename = f"profile_{self.role}_{arrow.now().format('YYYY-MM-DD_HH-mm-ss')}"
+
+        self._profile.dump_stats(f"{filename}.prof")
+
+        report = io.StringIO()
+        stats = pstats.Stats(self._profile, stream=report)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        with open(f"{filename}.txt", "w", encoding="utf-8") as file:
+            file.write(report.getvalue())
+
+        logger.info(f"Maximum event loop lag was {self._lag_probe.max_lag:.3f}s")
+        logger.info(f"Profile written to `{filename}.prof` and `{filename}.txt`")
@@ -0,0 +1,70 @@
+import asyncio
+import json
+from typing import Any
+
+import httpx
+
+from scrapers.scrapers.base import Source
+from scrapers.util.config import config
+from scrapers.util.show import Show
+
+# A search returns at most 100 results, so SD and HD are searched separately
+SD_CATEGORY = 205
+HD_CATEGORY = 208
+
+# apibay returns a single placeholder result rather than an empty list
+NO_RESULTS_ID = "0"
+
+
+async def get_api_data(show: Show, category: int, rate_limit, client):
+    async with rate_limit:
+        # https://apibay.org/q.php?q=tt1520211&cat=205
+        try:
+            response = await client.get(
+                f"{config.apibay_url}/q.php",
+                params={"q": f"tt{show.imdbid}", "cat": category},
+            )
+            return response.json()
+        except json.decoder.JSONDecodeError:
+            raise
+        except httpx.HTTPError:
+            raise
+
+
+class ApibaySource(Source):
+    key = "apibay"
+
+    def __init__(self):
+        super().__init__(
+            config.apibay_torrent_source, config.apibay_rate_limit_per_second
+        )
+
+    async def get_torrents(self, show: Show, client) -> list[dict[str, Any]]:
+        results = await asyncio.gather(
+            get_api_data(show, SD_CATEGORY, self.rate_limit, client),
+            get_api_data(show, HD_CATEGORY, self.rate_limit, client),
+        )
+
+        for result in results:
+            if not isinstance(result, list):
+                raise TypeError(f"Expected a list of results, got: {result!r:.200}")
+
+        # The same torrent can be listed in both categories
+        torrents: dict[str, dict[str, Any]] = {}
+        for torrent in (torrent for result in results for torrent in result):
+            if torrent["id"] == NO_RESULTS_ID:
+                continue
+
+            info_hash = torrent["info_hash"].upper()
+            torrents.setdefault(
+                info_hash,
+                {
+                    "title": torrent["name"],
+                    "info_hash": info_hash,
+                    "size": int(torrent["size"]),
+                    "seeders": int(torrent["seeders"]),
+                    "leechers": int(torrent["leechers"]),
+                },
+            )
+
+        return list(torrents.values())
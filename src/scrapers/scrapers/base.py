@@ -0,0 +1,42 @@
+from abc import ABC, abstractmethod
+from typing import Any
+
+from scrapers.util.http import create_rate_limiter
+from scrapers.util.show import Show
+
+
+class Source(ABC):
+    """
+    A torrent site that can be searched for the shows in a `ShowList`.
+
+    Every source has its own rate limiter, so several sources can be scraped at the
+    same time without one slowing down another. `get_torrents` returns normalised
+    records, so the consumer does not need to know which site they came from:
+
+        {
+            "title": str,
+            "info_hash": str,  # upper case
+            "size": int,  # bytes
+            "seeders": int,
+            "leechers": int,
+        }
+    """
+
+    # Short identifier, used in `ENABLED_SOURCES` and to route scraped shows
+    key: str
+
+    def __init__(self, name: str, rate_limit_per_second: int):
+        # Stored in the `source` column of the ingested torrents
+        self.name = name
+        self.rate_limit = create_rate_limiter(rate_limit_per_second)
+
+    def completion_key(self, show: Show) -> str:
+        """
+        Returns:
+            str: the entry recorded in the processed list once this source has
+            been scraped for `show`
+        """
+        return f"{self.key}:{show.url}"
+
+    @abstractmethod
+    async def get_torrents(self, show: Show, client) -> list[dict[str, Any]]: ...
@@ -3,18 +3,24 @@ import itertools
 import json
 import re
 from datetime import timedelta
+from typing import Any, Optional
 
 import arrow
 import httpx
-from aiolimiter import AsyncLimiter
 from loguru import logger
-from lxml import html
+from lxml import etree, html
 
+from scrapers.scrapers.base import Source
 from scrapers.util.config import config
+from scrapers.util.http import create_client, create_rate_limiter
+from scrapers.util.jsonstream import TorrentStreamParser
 from scrapers.util.show import Show
-from scrapers.util.showlist import ShowList
+from scrapers.util.showlist import ShowList, ShowListDiff
 from scrapers.util.util import readable_timedelta
 
+# The only torrent fields Knight Crawler ingests
+TORRENT_FIELDS = ("title", "hash", "size_bytes", "seeds", "peers")
+
 
 async def html_to_show(html) -> Show:
     url_element = html.xpath(".//td[@class='forum_thread_post']/a")[0]
@@ -37,7 +43,7 @@ async def add_imdbid_to_show(show: Show, rate_limit, client):
                 imdb_id = re.search(imdb_regex_pattern, html_response).group(1)
             except AttributeError:
                 imdb_id = None
-            logger.debug(f"Found IMDb ID: `{imdb_id}` for show: `{show.name}`")
+            logger.debug("Found IMDb ID: `{}` for show: `{}`", imdb_id, show.name)
             show.imdbid = imdb_id
         except httpx.HTTPError as e:
             logger.exception(e)
@@ -49,9 +55,9 @@ async def add_imdbid_to_show(show: Show, rate_limit, client):
             )
 
 
-async def get_all_imdbids(showlist: ShowList, eztv_showlist_file):
-    shows_without_imdbid = showlist.get_shows_with_no_imdbid()
-
+async def get_all_imdbids(
+    showlist: ShowList, shows_without_imdbid: list[Show], eztv_showlist_file
+):
     if len(shows_without_imdbid) == 0:
         logger.info("No shows need an IMDb update!")
         return
@@ -67,7 +73,7 @@ async def get_all_imdbids(showlist: ShowList, eztv_showlist_file):
         f"{len(shows_without_imdbid)} shows are missing an IMDb ID. Trying to get IMDb IDs, this may take a while..."
     )
 
-    rate_limit = AsyncLimiter(config.rate_limit_per_second, 1)
+    rate_limit = create_rate_limiter(config.rate_limit_per_second)
 
     total_number_of_batches = len(
         list(itertools.batched(shows_without_imdbid, config.batch_size))
@@ -76,7 +82,7 @@ async def get_all_imdbids(showlist: ShowList, eztv_showlist_file):
     for batch_number, batch_of_shows in enumerate(
         itertools.batched(shows_without_imdbid, config.batch_size), 1
     ):
-        async with httpx.AsyncClient() as client:
+        async with create_client() as client:
             await asyncio.gather(
                 *(
                     add_imdbid_to_show(show, rate_limit, client)
@@ -97,7 +103,24 @@ async def get_all_imdbids(showlist: ShowList, eztv_showlist_file):
         logger.info(f"Progress: {percentage_done:.2f}% / 100%")
 
 
-async def get_list_of_shows(showlist: ShowList, eztv_showlist_file: str):
+async def get_list_of_shows(
+    showlist: ShowList, eztv_showlist_file: str
+) -> Optional[ShowListDiff]:
+    """
+    Refreshes the showlist if it is too old, then finds the IMDb IDs of the shows
+    that are new or back on it. Shows that were already looked up are not tried
+    again, as most of them have no IMDb link on EZTV at all.
+
+    Returns:
+        ShowListDiff | None: what changed, or None if the showlist was not refreshed
+    """
+    if config.replay_archive:
+        # An archived showlist is older than the one on disk, applying it would undo
+        # everything that changed since it was recorded
+        logger.info("Replaying an archive, the showlist is used as it is")
+        return None
+
+    showlist_diff = None
     current_time = arrow.now()
     time_difference = current_time - showlist.timestamp
     max_age = timedelta(hours=4)
@@ -111,8 +134,10 @@ async def get_list_of_shows(showlist: ShowList, eztv_showlist_file: str):
         logger.info(f"Updating showlist from `{showlist_url}`")
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with create_client() as client:
                 response = await client.get(showlist_url)
+                # Includes an archive with no showlist in it when replaying
+                response.raise_for_status()
                 html_response = response.text
             # except json.decoder.JSONDecodeError:
             #     raise
@@ -126,32 +151,30 @@ async def get_list_of_shows(showlist: ShowList, eztv_showlist_file: str):
                 )
             )
 
-            number_of_new_shows = 0
-            number_of_updated_shows = 0
-            for show in updated_showlist:
-                # Try to add the show to our current showlist.
-                # If it succeeds, the show is new.
-                # If it fails we already have this show in our list, but we can update the
-                # `status` of the show without any additional GET requests.
-                if await showlist.add_show(show):
-                    logger.info(
-                        f"Found a new show: `{show.name}` ({number_of_new_shows} new shows so far)"
-                    )
-                    number_of_new_shows += 1
-                else:
-                    if await showlist.update_show_status(show.url, status=show.status):
-                        logger.debug(
-                            f"Show `{show.name}` status was updated to: `{show.status}`"
-                        )
-                        number_of_updated_shows += 1
-
-            logger.info(f"Total number of new shows found: {number_of_new_shows}")
+            showlist_diff = showlist.diff(updated_showlist)
+            await showlist.apply_diff(showlist_diff)
+
+            for show in showlist_diff.new:
+                logger.info("Found a new show: `{}`", show.name)
+            for show in showlist_diff.status_changed:
+                logger.debug(
+                    "Show `{}` status was updated to: `{}`", show.name, show.status
+                )
+            for show in showlist_diff.restored:
+                logger.info("Show `{}` is back on the showlist", show.name)
+            for show in showlist_diff.removed:
+                logger.info("Show `{}` was removed from the showlist", show.name)
+
+            logger.info(f"Total number of new shows found: {len(showlist_diff.new)}")
             logger.info(
-                f"Total number of shows updated with a new status: {number_of_updated_shows}"
+                f"Total number of shows updated with a new status: {len(showlist_diff.status_changed)}"
+            )
+            logger.info(
+                f"Total number of shows restored: {len(showlist_diff.restored)}, removed: {len(showlist_diff.removed)}"
             )
 
             await showlist.reset_timestamp()
-        except httpx.HTTPError as e:
+        except (httpx.HTTPError, etree.ParserError) as e:
             logger.exception(e)
             logger.error(
                 f"There appears to be an error accessing EZTV at the URL `{showlist_url}`"
@@ -160,18 +183,66 @@ async def get_list_of_shows(showlist: ShowList, eztv_showlist_file: str):
                 "The script will attempt to continue, but please can you post the logs in Discord and tag @TheBestEmily"
             )
 
-    await get_all_imdbids(showlist, eztv_showlist_file)
+    if showlist_diff is not None:
+        shows_without_imdbid = [
+            existing
+            for show in showlist_diff.new + showlist_diff.restored
+            for existing in showlist.search_by_url(show.url)
+            if existing.imdbid is None
+        ]
+        await get_all_imdbids(showlist, shows_without_imdbid, eztv_showlist_file)
+
+    return showlist_diff
 
 
 async def get_api_data(show: Show, rate_limit, client):
+    """
+    Streams the get-torrents response, keeping only `TORRENT_FIELDS` of each torrent.
+
+    Returns:
+        dict: the pagination metadata (`torrents_count`, `limit`, `page`, ...) and
+        the compact `torrents`
+    """
     async with rate_limit:
         # https://eztvx.to/api/get-torrents?imdb_id=6048596
         try:
-            response = await client.get(
-                f"{config.eztv_url}/api/get-torrents?imdb_id={show.imdbid}"
-            )
-            return response.json()
+            parser = TorrentStreamParser(TORRENT_FIELDS)
+            torrents = []
+            async with client.stream(
+                "GET", f"{config.eztv_url}/api/get-torrents?imdb_id={show.imdbid}"
+            ) as response:
+                async for chunk in response.aiter_bytes():
+                    torrents.extend(parser.feed(chunk))
+
+            api_data = parser.close()
+            api_data["torrents"] = torrents
+            return api_data
         except json.decoder.JSONDecodeError:
             raise
         except httpx.HTTPError:
             raise
+
+
+class EztvSource(Source):
+    key = "eztv"
+
+    def __init__(self):
+        super().__init__(config.torrent_source, config.rate_limit_per_second)
+
+    def completion_key(self, show: Show) -> str:
+        # Plain URLs, so processed lists from before there were other sources still apply
+        return show.url
+
+    async def get_torrents(self, show: Show, client) -> list[dict[str, Any]]:
+        api_data = await get_api_data(show, self.rate_limit, client)
+
+        return [
+            {
+                "title": torrent["title"],
+                "info_hash": torrent["hash"].upper(),
+                "size": int(torrent["size_bytes"]),
+                "seeders": torrent["seeds"],
+                "leechers": torrent["peers"],
+            }
+            for torrent in api_data["torrents"]
+        ]
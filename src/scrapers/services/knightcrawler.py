@@ -1,22 +1,29 @@
 import asyncio
+import contextlib
 import datetime
 import itertools
 import json
 import os
+from typing import Optional
 
-import aio_pika
 import aiofiles
 import asyncpg
 import httpx
-import jsonpickle
-from aio_pika.abc import AbstractRobustConnection
-from aiolimiter import AsyncLimiter
 from loguru import logger
 
-from scrapers.scrapers import eztv
+from scrapers.scrapers.apibay import ApibaySource
+from scrapers.scrapers.base import Source
+from scrapers.scrapers.eztv import EztvSource
+from scrapers.transports.amqp import AmqpTransport
+from scrapers.transports.base import Transport
+from scrapers.transports.postgres import PostgresTransport
 from scrapers.util.config import config
+from scrapers.util.http import create_client
+from scrapers.util.postgres import create_pool
 from scrapers.util.show import Show
-from scrapers.util.showlist import ShowList
+from scrapers.util.showlist import ShowList, ShowListDiff
+
+QUEUE_NAME = "eztvpy"
 
 
 class HTTPErrorCount:
@@ -38,6 +45,10 @@ class CompletedUrls:
         async with self._lock:
             self._completed_urls.add(url)
 
+    async def discard(self, url):
+        async with self._lock:
+            self._completed_urls.discard(url)
+
     async def get(self) -> set[str]:
         return set(self._completed_urls)
 
@@ -73,32 +84,72 @@ class CompletedUrls:
         data = {
             "completed_urls": list(self._completed_urls),
         }
-        logger.debug(f"Saving Knight Crawler processed list to `{filename}`")
+        logger.debug("Saving Knight Crawler processed list to `{}`", filename)
         async with aiofiles.open(filename, "w", encoding="utf-8") as file:
             await file.write(json.dumps(data))
 
 
+def create_transport(
+    loop: asyncio.AbstractEventLoop, postgres_pool: Optional[asyncpg.Pool] = None
+) -> Transport:
+    if config.transport == "postgres":
+        return PostgresTransport(QUEUE_NAME, postgres_pool)  # type: ignore
+    return AmqpTransport(QUEUE_NAME, loop)
+
+
+def get_sources() -> dict[str, Source]:
+    sources: list[Source] = [EztvSource(), ApibaySource()]
+    return {source.key: source for source in sources}
+
+
+def get_enabled_sources() -> list[Source]:
+    sources = get_sources()
+    enabled = [key.strip() for key in config.enabled_sources.split(",") if key.strip()]
+
+    for key in enabled:
+        if key not in sources:
+            raise ValueError(
+                f"Unknown source `{key}` in ENABLED_SOURCES. Choose from: {', '.join(sources)}"
+            )
+
+    return [sources[key] for key in enabled]
+
+
 async def produce(
-    show: Show, rate_limit, client, channel, queue, http_error_count: HTTPErrorCount
+    show: Show,
+    source: Source,
+    client,
+    transport: Transport,
+    http_error_count: HTTPErrorCount,
 ):
-    logger.debug(f"Scraping show: `{show.name}` with IMDb id: `{show.imdbid}`")
+    logger.debug(
+        "Scraping show: `{}` with IMDb id: `{}` from {}",
+        show.name,
+        show.imdbid,
+        source.name,
+    )
     try:
-        show_json = await eztv.get_api_data(show, rate_limit, client)
+        torrents = await source.get_torrents(show, client)
 
-        await channel.default_exchange.publish(
-            aio_pika.Message(body=jsonpickle.encode((show, show_json)).encode()),
-            routing_key=queue.name,
-        )
+        await transport.publish((show, source.key, torrents))
     except json.decoder.JSONDecodeError:
         return
+    except (KeyError, TypeError, ValueError) as e:
+        # An unexpected response for this show, the others can still be scraped
+        logger.exception(e)
+        logger.error(
+            f"Unexpected response from {source.name} for the show `{show.name}` with IMDb id: `{show.imdbid}`. Skipping it"
+        )
     except httpx.HTTPError as e:
         if http_error_count.count > 5:
-            logger.error("We are encountering significant errors in accessing EZTV.")
+            logger.error(
+                f"We are encountering significant errors in accessing {source.name}."
+            )
             logger.error("The script will now self terminate")
             raise KeyboardInterrupt
         logger.exception(e)
         logger.error(
-            f"There appears to be an error accessing EZTV at the URL `{config.eztv_url}/api/get-torrents?imdb_id={show.imdbid}`"
+            f"There appears to be an error accessing {source.name} for the show `{show.name}` with IMDb id: `{show.imdbid}`"
         )
         logger.error(
             f"The script will attempt to continue (attempt {http_error_count.count}/5), but please can you post the logs in Discord and tag @TheBestEmily"
@@ -106,111 +157,119 @@ async def produce(
         await http_error_count.increase()
 
 
-async def producer(channel, queue, showlist):
-    rate_limit = AsyncLimiter(config.rate_limit_per_second, 1)
-
-    total_number_of_batches = len(list(itertools.batched(showlist, config.batch_size)))
-
+async def produce_source(
+    source: Source, shows: list[Show], client, transport: Transport
+):
+    # Each source has its own error budget, so one failing site does not stop the rest
     http_error_count = HTTPErrorCount()
 
-    async with httpx.AsyncClient() as client:
-        for batch_number, batch_of_shows in enumerate(
-            itertools.batched(showlist, config.batch_size), 1
-        ):
-            await asyncio.gather(
-                *(
-                    produce(show, rate_limit, client, channel, queue, http_error_count)
-                    for show in batch_of_shows
-                )
+    total_number_of_batches = len(list(itertools.batched(shows, config.batch_size)))
+
+    for batch_number, batch_of_shows in enumerate(
+        itertools.batched(shows, config.batch_size), 1
+    ):
+        await asyncio.gather(
+            *(
+                produce(show, source, client, transport, http_error_count)
+                for show in batch_of_shows
             )
+        )
+
+        percentage_done = (batch_number / total_number_of_batches) * 100
+        logger.info(f"{source.name} progress: {percentage_done:.2f}% / 100%")
 
-            percentage_done = (batch_number / total_number_of_batches) * 100
-            logger.info(f"Progress: {percentage_done:.2f}% / 100%")
+
+async def producer(
+    transport: Transport, shows_by_source: list[tuple[Source, list[Show]]]
+):
+    await transport.publish_start()
+
+    # Each source works through its shows at the pace of its own rate limiter
+    async with create_client() as client:
+        await asyncio.gather(
+            *(
+                produce_source(source, shows, client, transport)
+                for source, shows in shows_by_source
+            )
+        )
 
     # Kill signal for consumers
-    await channel.default_exchange.publish(
-        aio_pika.Message(body=jsonpickle.encode(None).encode()),
-        routing_key=queue.name,
+    await transport.publish_end()
+
+
+async def consume(scraped_show: tuple, postgres, sources: dict[str, Source]):
+    """
+    Args:
+        scraped_show (tuple): the show, the key of its source and the normalised
+            torrents from the producer
+        postgres: a pool or connection, anything with `fetchval` and `execute`
+        sources (dict[str, Source]): every known source by key
+    """
+    (show, source_key, torrents) = scraped_show
+    source = sources[source_key]
+
+    logger.debug(
+        "Found {} torrents from {} for the show `{}`",
+        len(torrents),
+        source.name,
+        show.name,
     )
 
+    for torrent in torrents:
+        info_hash = torrent["info_hash"]
+        created_at = datetime.datetime.now()
+        updated_at = created_at
+
+        exists_query = f"""
+            SELECT EXISTS (
+                SELECT 1
+                FROM {config.ingested_torrents_table}
+                WHERE info_hash = $1 AND source = $2
+            );
+            """
+
+        exists = await postgres.fetchval(exists_query, info_hash, source.name)
+
+        if exists:
+            # This torrent is already in the database. Continue.
+            continue
+
+        # `ON CONFLICT DO NOTHING` rather than an error, as an error would abort the
+        # transaction of a Postgres transport batch
+        await postgres.execute(
+            f"""INSERT INTO {config.ingested_torrents_table} (name, source, category, info_hash, size, seeders, leechers, imdb, processed, "createdAt", "updatedAt")
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+                ON CONFLICT DO NOTHING""",
+            torrent["title"],
+            source.name,
+            "tv",
+            info_hash,
+            f"{torrent['size']}",
+            torrent["seeders"],
+            torrent["leechers"],
+            f"tt{show.imdbid}",
+            False,
+            created_at,
+            updated_at,
+        )
 
-async def consume(scraped_show: tuple, postgres_pool, completed_urls: CompletedUrls):
-    (show, show_json) = scraped_show
 
-    try:
-        logger.debug(
-            f"Found {len(show_json["torrents"])} torrents for the show `{show.name}`"
-        )
+async def consumer(transport: Transport, postgres_pool, completed_urls):
+    sources = get_sources()
+
+    async def handle(scraped_show: tuple, postgres):
+        await consume(scraped_show, postgres, sources)
+
+    async def completed(scraped_show: tuple):
+        (show, source_key, _) = scraped_show
+        source = sources[source_key]
+        await completed_urls.add(source.completion_key(show))
+        # A replay reprocesses shows that are already done, leave the live list alone
+        if not config.replay_archive:
+            await completed_urls.save_to_file()
+        logger.debug("`{}` completed for {}.", show.name, source.name)
 
-        for torrent in show_json["torrents"]:
-            title = torrent["title"]
-            info_hash = torrent["hash"].upper()
-            size = int(torrent["size_bytes"])
-            seeders = torrent["seeds"]
-            leechers = torrent["peers"]
-            created_at = datetime.datetime.now()
-            updated_at = created_at
-
-            exists_query = f"""
-                SELECT EXISTS (
-                    SELECT 1
-                    FROM {config.ingested_torrents_table}
-                    WHERE info_hash = $1 AND source = $2
-                );
-                """
-
-            async with postgres_pool.acquire() as con:
-                exists = await con.fetchval(
-                    exists_query, info_hash, config.torrent_source
-                )
-
-            if exists:
-                # This torrent is already in the database. Continue.
-                continue
-
-            try:
-                async with postgres_pool.acquire() as con:
-                    await con.execute(
-                        f"""INSERT INTO {config.ingested_torrents_table} (name, source, category, info_hash, size, seeders, leechers, imdb, processed, "createdAt", "updatedAt")
-                            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)""",
-                        title,
-                        config.torrent_source,
-                        "tv",
-                        info_hash,
-                        f"{size}",
-                        seeders,
-                        leechers,
-                        f"tt{show.imdbid}",
-                        False,
-                        created_at,
-                        updated_at,
-                    )
-            except asyncpg.exceptions.UniqueViolationError:
-                continue
-
-    except KeyError:
-        logger.debug(f"Found 0 torrents for the show `{show.name}`")
-    finally:
-        await completed_urls.add(show.url)
-        logger.debug(f"`{show.name}` completed.")
-
-
-async def consumer(channel, queue, postgres_pool, completed_urls):
-    async with queue.iterator() as queue_iter:
-        # Cancel consuming after __aexit__
-        async for message in queue_iter:
-            async with message.process():
-                show = jsonpickle.decode(message.body)
-
-                if show is None:
-                    await channel.default_exchange.publish(
-                        aio_pika.Message(body=jsonpickle.encode(None).encode()),
-                        routing_key=queue.name,
-                    )
-                    break  # End the infinite loop for THIS consumer
-
-                await consume(show, postgres_pool, completed_urls)  # type: ignore
-                await completed_urls.save_to_file()
+    await transport.consume(handle, completed, postgres_pool)
 
     # while True:  # Can't use `while not queue.empty()` as it starts empty and the consumers die before any data is provided by the producer
     #     batch_of_shows = await queue.get()
@@ -229,55 +288,73 @@ async def consumer(channel, queue, postgres_pool, completed_urls):
     #     queue.task_done()
 
 
+async def rescan_changed_shows(showlist_diff: ShowListDiff):
+    """
+    Drops shows that changed on the showlist from the processed list, so the next
+    producer run scrapes them again on every source.
+    """
+    if not showlist_diff.rescan or config.replay_archive:
+        return
+
+    completed_urls: CompletedUrls = CompletedUrls()
+    await completed_urls.load_from_file()
+
+    sources = get_sources().values()
+    for show in showlist_diff.rescan:
+        for source in sources:
+            await completed_urls.discard(source.completion_key(show))
+
+    logger.info(f"{len(showlist_diff.rescan)} changed shows will be scraped again")
+    await completed_urls.save_to_file()
+
+
 async def scrape_eztv(showlist: ShowList, loop: asyncio.AbstractEventLoop):
     completed_urls: CompletedUrls = CompletedUrls()
     await completed_urls.load_from_file()
 
-    # List of shows that have not been completed
-    shows_with_imdbid = [
-        show
-        for show in showlist.get_shows_with_imdbid()
-        if show.url not in await completed_urls.get()
-    ]
+    completed = await completed_urls.get()
+    if config.replay_archive:
+        # Replaying is for reprocessing, so every show is scraped again
+        logger.info("Replaying an archive, ignoring the processed list")
+        completed = set()
+    shows_with_imdbid = showlist.get_shows_with_imdbid()
+
+    # Shows that have not been completed, for each source
+    shows_by_source: list[tuple[Source, list[Show]]] = []
+    for source in get_enabled_sources():
+        shows = [
+            show
+            for show in shows_with_imdbid
+            if source.completion_key(show) not in completed
+        ]
+
+        if config.debug_mode:
+            logger.debug(
+                f"Debug mode enabled. Limiting {source.name} to {config.debug_processing_limit} updates"
+            )
+            shows = shows[0 : config.debug_processing_limit]
 
-    if config.debug_mode:
-        logger.debug(
-            f"Debug mode enabled. Limiting to {config.debug_processing_limit} updates"
-        )
-        shows_with_imdbid = shows_with_imdbid[0 : config.debug_processing_limit]
+        logger.info(f"{len(shows)} shows have not been scraped on {source.name}.")
+        shows_by_source.append((source, shows))
 
-    logger.info(
-        f"{len(shows_with_imdbid)} shows have not been scraped. Starting the scraper, this may take a while..."
-    )
+    logger.info("Starting the scraper, this may take a while...")
 
-    mq_connection: AbstractRobustConnection = await aio_pika.connect_robust(
-        config.rabbit_uri, loop=loop
-    )
+    async with contextlib.AsyncExitStack() as stack:
+        postgres_pool = None
+        if config.transport == "postgres":
+            postgres_pool = await stack.enter_async_context(create_pool())
 
-    async with mq_connection:
-        channel = await mq_connection.channel()
-        queue = await channel.declare_queue("eztvpy")
-        await producer(channel, queue, shows_with_imdbid)
+        transport = await stack.enter_async_context(
+            create_transport(loop, postgres_pool)
+        )
+        await producer(transport, shows_by_source)
 
 
 async def consume_eztv(showlist: ShowList, loop: asyncio.AbstractEventLoop):
     completed_urls: CompletedUrls = CompletedUrls()
     await completed_urls.load_from_file()
 
-    mq_connection: AbstractRobustConnection = await aio_pika.connect_robust(
-        config.rabbit_uri, loop=loop
-    )
-
-    async with mq_connection:
-        async with asyncpg.create_pool(
-            user=config.postgres_user,
-            password=config.postgres_password,
-            database=config.postgres_db,
-            host=config.postgres_host,
-            port=config.postgres_port,
-            command_timeout=60,
-        ) as postgres_pool:
-            channel = await mq_connection.channel()
-            queue = await channel.declare_queue("eztvpy")
+    async with create_pool() as postgres_pool:
+        async with create_transport(loop, postgres_pool) as transport:
             logger.info("Consumer is running...")
-            await consumer(channel, queue, postgres_pool, completed_urls)
+            await consumer(transport, postgres_pool, completed_urls)
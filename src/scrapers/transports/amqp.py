@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any, Optional
+
+import aio_pika
+import jsonpickle
+from aio_pika.abc import AbstractChannel, AbstractQueue, AbstractRobustConnection
+
+from scrapers.transports.base import CompletedHandler, Handler, Transport
+from scrapers.util.config import config
+
+
+class AmqpTransport(Transport):
+    """
+    Publishes jsonpickled shows to a RabbitMQ queue. `None` is the kill signal, each
+    consumer publishes it again before stopping so the next consumer sees it too.
+    """
+
+    def __init__(self, queue_name: str, loop: asyncio.AbstractEventLoop):
+        super().__init__(queue_name)
+        self._loop = loop
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._channel: Optional[AbstractChannel] = None
+        self._queue: Optional[AbstractQueue] = None
+
+    async def connect(self):
+        self._connection = await aio_pika.connect_robust(
+            config.rabbit_uri, loop=self._loop
+        )
+        self._channel = await self._connection.channel()
+        self._queue = await self._channel.declare_queue(self.queue_name)
+
+    async def close(self):
+        if self._connection is not None:
+            await self._connection.close()
+
+    async def publish(self, scraped_show: Any):
+        await self._channel.default_exchange.publish(  # type: ignore
+            aio_pika.Message(body=jsonpickle.encode(scraped_show).encode()),
+            routing_key=self.queue_name,
+        )
+
+    async def publish_end(self):
+        await self.publish(None)
+
+    async def consume(
+        self, handler: Handler, completed: CompletedHandler, postgres_pool
+    ):
+        async with self._queue.iterator() as queue_iter:  # type: ignore
+            # Cancel consuming after __aexit__
+            async for message in queue_iter:
+                async with message.process():
+                    scraped_show = jsonpickle.decode(message.body)
+
+                    if scraped_show is None:
+                        await self.publish_end()
+                        break  # End the infinite loop for THIS consumer
+
+                    await handler(scraped_show, postgres_pool)
+                    await completed(scraped_show)
@@ -0,0 +1,60 @@
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable
+
+# Called once per scraped show with something that can run queries, either the
+# consumer's pool or the connection holding the claimed work
+Handler = Callable[[Any, Any], Awaitable[None]]
+# Called once per scraped show after its work has been committed
+CompletedHandler = Callable[[Any], Awaitable[None]]
+
+
+class Transport(ABC):
+    """
+    Carries scraped shows from the producer to the consumers.
+
+    Example usage:
+        async with AmqpTransport("eztvpy", loop) as transport:
+            await transport.publish_start()
+            await transport.publish((show, show_json))
+            await transport.publish_end()
+    """
+
+    def __init__(self, queue_name: str):
+        self.queue_name = queue_name
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @abstractmethod
+    async def connect(self) -> None: ...
+
+    @abstractmethod
+    async def close(self) -> None: ...
+
+    async def publish_start(self) -> None:
+        """
+        Called by the producer before its first publish, to clear anything left
+        over from the previous run.
+        """
+
+    @abstractmethod
+    async def publish(self, scraped_show: Any) -> None: ...
+
+    @abstractmethod
+    async def publish_end(self) -> None:
+        """
+        Tells every consumer there is no more work once the queue is empty.
+        """
+
+    @abstractmethod
+    async def consume(
+        self, handler: Handler, completed: CompletedHandler, postgres_pool
+    ) -> None:
+        """
+        Calls `handler` for each scraped show until `publish_end` is seen, then
+        `completed` once the show's work can no longer be rolled back.
+        """
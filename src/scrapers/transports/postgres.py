@@ -0,0 +1,186 @@
+import asyncio
+from contextlib import suppress
+from typing import Any, Optional
+
+import asyncpg
+import jsonpickle
+from loguru import logger
+
+from scrapers.transports.base import CompletedHandler, Handler, Transport
+from scrapers.util.config import config
+
+
+class PostgresTransport(Transport):
+    """
+    A work queue on a Postgres table, for deployments that would rather not run
+    RabbitMQ next to the Postgres they already have.
+
+    Consumers claim jobs in batches with `FOR UPDATE SKIP LOCKED`, so they never
+    block each other, and ingest them on the same connection and transaction. Each
+    job runs in its own savepoint. A job that fails is rolled back on its own and
+    kept as a dead letter, with `failedAt` and `error` set, instead of taking the
+    batch down with it. A job is only deleted once its torrents are committed. Idle
+    consumers sleep until a `NOTIFY` from the producer, with a poll as a fallback.
+
+    A row with a NULL payload is the kill signal. It is left in place so every
+    consumer sees it, and deleted when the next producer run starts. A marker only
+    counts if no job was published after it, and if it was published after the
+    consumer started or after a job the consumer claimed. A marker left by the
+    previous run is never mistaken for the end of a run that has not started
+    publishing yet, so a consumer started between runs waits for the next one.
+    """
+
+    def __init__(self, queue_name: str, postgres_pool: asyncpg.Pool):
+        super().__init__(queue_name)
+        self._pool = postgres_pool
+        self._table = config.work_queue_table
+        self._channel = f"{queue_name}_jobs"
+        self._wake = asyncio.Event()
+
+    async def connect(self):
+        index_name = f"{self._table.split('.')[-1]}_queue_id_idx"
+        try:
+            await self._pool.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self._table} (
+                    id bigserial PRIMARY KEY,
+                    queue text NOT NULL,
+                    payload text,
+                    "createdAt" timestamptz NOT NULL DEFAULT now()
+                );
+                ALTER TABLE {self._table}
+                    ADD COLUMN IF NOT EXISTS "failedAt" timestamptz,
+                    ADD COLUMN IF NOT EXISTS error text;
+                CREATE INDEX IF NOT EXISTS {index_name} ON {self._table} (queue, id);
+                """
+            )
+        except asyncpg.exceptions.UniqueViolationError:
+            # Another producer or consumer created the table at the same time
+            pass
+
+    async def close(self):
+        # The pool belongs to the caller
+        pass
+
+    async def publish(self, scraped_show: Any):
+        await self._insert(jsonpickle.encode(scraped_show))
+
+    async def publish_start(self):
+        await self._pool.execute(
+            f"DELETE FROM {self._table} WHERE queue = $1 AND payload IS NULL",
+            self.queue_name,
+        )
+
+    async def publish_end(self):
+        await self._insert(None)
+
+    async def consume(
+        self, handler: Handler, completed: CompletedHandler, postgres_pool
+    ):
+        listener = await postgres_pool.acquire()
+        await listener.add_listener(self._channel, self._notified)
+        # The database clock, so it compares with "createdAt" without any skew
+        started_at = await postgres_pool.fetchval("SELECT now()")
+        last_claimed_id: Optional[int] = None
+        try:
+            while True:
+                # Cleared before claiming so a NOTIFY sent while we work is not lost
+                self._wake.clear()
+
+                async with postgres_pool.acquire() as con:
+                    async with con.transaction():
+                        jobs = await con.fetch(
+                            f"""
+                            SELECT id, payload
+                            FROM {self._table}
+                            WHERE queue = $1
+                                AND payload IS NOT NULL
+                                AND "failedAt" IS NULL
+                            ORDER BY id
+                            LIMIT $2
+                            FOR UPDATE SKIP LOCKED
+                            """,
+                            self.queue_name,
+                            config.batch_size,
+                        )
+
+                        succeeded = []
+                        for job in jobs:
+                            try:
+                                scraped_show = jsonpickle.decode(job["payload"])
+                                # A savepoint, so only this job is rolled back
+                                async with con.transaction():
+                                    await handler(scraped_show, con)
+                            except Exception as e:
+                                logger.exception(e)
+                                logger.error(
+                                    f"Job {job['id']} failed and was moved to the dead letters"
+                                )
+                                await con.execute(
+                                    f"""UPDATE {self._table}
+                                        SET "failedAt" = now(), error = $2
+                                        WHERE id = $1""",
+                                    job["id"],
+                                    repr(e),
+                                )
+                            else:
+                                succeeded.append((job["id"], scraped_show))
+
+                        if succeeded:
+                            await con.execute(
+                                f"DELETE FROM {self._table} WHERE id = ANY($1::bigint[])",
+                                [job_id for job_id, _ in succeeded],
+                            )
+
+                if jobs:
+                    last_claimed_id = jobs[-1]["id"]
+                    # The batch is committed, the work can no longer be undone
+                    for _, scraped_show in succeeded:
+                        await completed(scraped_show)
+                    continue
+
+                finished = await postgres_pool.fetchval(
+                    f"""
+                    SELECT EXISTS (
+                        SELECT 1
+                        FROM {self._table} AS marker
+                        WHERE marker.queue = $1
+                            AND marker.payload IS NULL
+                            AND (marker."createdAt" > $2 OR marker.id > $3)
+                            AND NOT EXISTS (
+                                SELECT 1
+                                FROM {self._table} AS job
+                                WHERE job.queue = $1
+                                    AND job.payload IS NOT NULL
+                                    AND job.id > marker.id
+                            )
+                    );
+                    """,
+                    self.queue_name,
+                    started_at,
+                    last_claimed_id,
+                )
+                if finished:
+                    break  # End the infinite loop for THIS consumer
+
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        self._wake.wait(), timeout=config.work_queue_poll_interval
+                    )
+        finally:
+            await listener.remove_listener(self._channel, self._notified)
+            await postgres_pool.release(listener)
+
+    async def _insert(self, payload: Optional[str]):
+        async with self._pool.acquire() as con:
+            async with con.transaction():
+                await con.execute(
+                    f"INSERT INTO {self._table} (queue, payload) VALUES ($1, $2)",
+                    self.queue_name,
+                    payload,
+                )
+                # Delivered when the transaction commits
+                await con.execute("SELECT pg_notify($1, '')", self._channel)
+
+    def _notified(self, connection, pid, channel, payload):
+        self._wake.set()
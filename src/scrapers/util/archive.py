@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import zlib
+from typing import Optional
+
+import aiofiles
+import arrow
+import httpx
+from loguru import logger
+
+
+class ResponseArchive:
+    """
+    An append-only archive of HTTP responses, indexed by URL and timestamp.
+
+    Bodies are zlib compressed one after another in `responses.dat`. Each line of
+    `index.jsonl` records where a body lives along with its URL, the time it was
+    fetched, the status code and the headers. Bodies are stored exactly as they came
+    off the wire, so replaying a response goes through the same decoding as the
+    original did.
+
+    Example usage:
+        archive = ResponseArchive("archive")
+
+        await archive.append(url, 200, [("content-type", "application/json")], body)
+        status, headers, body = await archive.get(url)
+    """
+
+    def __init__(self, path: str):
+        if not os.path.isabs(path):
+            path = os.path.join(os.getcwd(), path)
+
+        self.path = path
+        self._data_file = os.path.join(path, "responses.dat")
+        self._index_file = os.path.join(path, "index.jsonl")
+        # URL -> index entries, oldest first
+        self._index: dict[str, list[dict]] = {}
+        self._size = 0
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def append(
+        self, url: str, status: int, headers: list[tuple[str, str]], body: bytes
+    ):
+        compressed = await asyncio.to_thread(zlib.compress, body)
+
+        async with self._lock:
+            await self._load()
+
+            entry = {
+                "url": url,
+                "timestamp": arrow.utcnow().for_json(),
+                "status": status,
+                "headers": headers,
+                "offset": self._size,
+                "length": len(compressed),
+            }
+            async with aiofiles.open(self._data_file, "ab") as file:
+                await file.write(compressed)
+            async with aiofiles.open(self._index_file, "a", encoding="utf-8") as file:
+                await file.write(json.dumps(entry) + "\n")
+
+            self._size += len(compressed)
+            self._index.setdefault(url, []).append(entry)
+
+    async def get(self, url: str) -> Optional[tuple[int, list[tuple[str, str]], bytes]]:
+        """
+        Returns:
+            tuple | None: the status, headers and body of the most recent response
+            for `url`, or None if it was never archived
+        """
+        async with self._lock:
+            await self._load()
+
+            entries = self._index.get(url)
+            if not entries:
+                return None
+            entry = entries[-1]
+
+            async with aiofiles.open(self._data_file, "rb") as file:
+                await file.seek(entry["offset"])
+                compressed = await file.read(entry["length"])
+
+        headers = [(name, value) for name, value in entry["headers"]]
+        return entry["status"], headers, zlib.decompress(compressed)
+
+    async def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+
+        os.makedirs(self.path, exist_ok=True)
+        try:
+            self._size = os.path.getsize(self._data_file)
+            async with aiofiles.open(self._index_file, "r", encoding="utf-8") as file:
+                async for line in file:
+                    entry = json.loads(line)
+                    self._index.setdefault(entry["url"], []).append(entry)
+        except FileNotFoundError:
+            logger.debug(f"Starting a new response archive in `{self.path}`")
+
+        logger.info(f"Loaded {len(self._index)} archived URLs from `{self.path}`")
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    def __init__(
+        self,
+        stream: httpx.AsyncByteStream,
+        archive: ResponseArchive,
+        url: str,
+        status: int,
+        headers: list[tuple[str, str]],
+    ):
+        self._stream = stream
+        self._archive = archive
+        self._url = url
+        self._status = status
+        self._headers = headers
+        self._chunks: list[bytes] = []
+        self._complete = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._chunks.append(chunk)
+            yield chunk
+        self._complete = True
+
+    async def aclose(self):
+        await self._stream.aclose()
+        # Partially read responses are not worth replaying
+        if self._complete:
+            await self._archive.append(
+                self._url, self._status, self._headers, b"".join(self._chunks)
+            )
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """
+    Sends requests over the network, or through `transport` if one is given, and
+    archives every complete response.
+    """
+
+    def __init__(
+        self,
+        archive: ResponseArchive,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._archive = archive
+        self._transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self._transport.handle_async_request(request)
+
+        # The body is replayed in one piece, so chunked framing no longer applies
+        headers = [
+            (name, value)
+            for name, value in response.headers.multi_items()
+            if name.lower() != "transfer-encoding"
+        ]
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(
+                response.stream,  # type: ignore
+                self._archive,
+                str(request.url),
+                response.status_code,
+                headers,
+            ),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Answers requests from the archive without touching the network. URLs that were
+    never archived get an empty 404.
+    """
+
+    def __init__(self, archive: ResponseArchive):
+        self._archive = archive
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        archived = await self._archive.get(str(request.url))
+        if archived is None:
+            logger.debug("No archived response for `{}`", request.url)
+            return httpx.Response(404)
+
+        status, headers, body = archived
+        return httpx.Response(status_code=status, headers=headers, content=body)
@@ -0,0 +1,38 @@
+import contextlib
+from typing import Optional
+
+import httpx
+from aiolimiter import AsyncLimiter
+
+from scrapers.util.archive import RecordingTransport, ReplayTransport, ResponseArchive
+from scrapers.util.config import config
+
+# Shared by every client so all responses go through one archive and one lock
+_archive: Optional[ResponseArchive] = None
+
+
+def get_archive() -> Optional[ResponseArchive]:
+    global _archive
+
+    path = config.replay_archive or config.record_archive
+    if path is None:
+        return None
+    if _archive is None:
+        _archive = ResponseArchive(path)
+    return _archive
+
+
+def create_client() -> httpx.AsyncClient:
+    archive = get_archive()
+    if archive is None:
+        return httpx.AsyncClient()
+    if config.replay_archive:
+        return httpx.AsyncClient(transport=ReplayTransport(archive))
+    return httpx.AsyncClient(transport=RecordingTransport(archive))
+
+
+def create_rate_limiter(rate_limit_per_second: int):
+    # Replaying only reads from disk, so there is nothing to be polite to
+    if config.replay_archive:
+        return contextlib.nullcontext()
+    return AsyncLimiter(rate_limit_per_second, 1)
@@ -0,0 +1,157 @@
+import json
+import re
+from typing import Any, Optional
+
+try:
+    # Optional, installed with `poetry install --extras fast`
+    import orjson
+
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+# A complete string, a lone quote (a string that continues in the next chunk) or a
+# structural character. Everything else is skipped over by the regex engine.
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|["{}\[\]]')
+# Where an object in the array could end: before the next element or the array end
+_OBJECT_END = re.compile(rb"}\s*[,\]]")
+_SEPARATOR = re.compile(rb"[\s,]*")
+
+
+class TorrentStreamParser:
+    """
+    Incrementally parses a get-torrents API response without building the whole
+    document in memory.
+
+    Each object in the top level `torrents` array is decoded on its own as soon as
+    it has fully arrived, and only `fields` are kept. Everything outside the array
+    (`torrents_count`, `limit`, `page`, ...) is decoded once the response ends.
+
+    Example usage:
+        parser = TorrentStreamParser(fields=("title", "hash"))
+
+        async for chunk in response.aiter_bytes():
+            for torrent in parser.feed(chunk):
+                ...
+
+        metadata = parser.close()
+    """
+
+    def __init__(self, fields: tuple[str, ...], array_key: str = "torrents"):
+        self.fields = fields
+        self._array_key = f'"{array_key}"'.encode()
+        self._buffer = b""
+        self._depth = 0
+        self._last_string: Optional[bytes] = None
+        self._in_array = False
+        # Bytes outside the array, decoded at the end for the metadata
+        self._skeleton = bytearray()
+
+    def feed(self, chunk: bytes) -> list[dict[str, Any]]:
+        buffer = self._buffer + chunk
+        position = 0
+        records = []
+
+        while position < len(buffer):
+            if not self._in_array:
+                position = self._scan_skeleton(buffer, position)
+                if not self._in_array:
+                    break
+                continue
+
+            position = _SEPARATOR.match(buffer, position).end()  # type: ignore
+            if position == len(buffer):
+                break
+
+            if buffer[position] == 0x5D:  # ']'
+                self._in_array = False
+                continue
+
+            decoded = self._decode_objects(buffer, position)
+            if decoded is None:
+                # The object continues in the next chunk
+                break
+
+            objects, position = decoded
+            records.extend(
+                {field: record[field] for field in self.fields if field in record}
+                for record in objects
+            )
+
+        self._buffer = buffer[position:]
+
+        return records
+
+    def close(self) -> dict[str, Any]:
+        """
+        Returns:
+            dict: the top level keys of the response, with the array left empty
+        """
+        if not self._in_array:
+            self._skeleton += self._buffer
+
+        # Raises a JSONDecodeError for truncated or non JSON responses
+        return loads(bytes(self._skeleton))
+
+    def _scan_skeleton(self, buffer: bytes, position: int) -> int:
+        """
+        Copies bytes outside the array into the skeleton until the array starts.
+
+        Returns:
+            int: where scanning stopped, either the start of an unfinished string or
+            the first byte inside the array
+        """
+        scanned = len(buffer)
+        for match in _TOKEN.finditer(buffer, position):
+            token = match.group()
+            if token == b'"':
+                # Unterminated string, wait for the next chunk
+                scanned = match.start()
+                break
+
+            if token[0] == 0x22:  # '"'
+                if self._depth == 1:
+                    self._last_string = token
+            elif token == b"{" or token == b"[":
+                self._depth += 1
+                if (
+                    token == b"["
+                    and self._depth == 2
+                    and self._last_string == self._array_key
+                ):
+                    self._in_array = True
+                    scanned = match.end()
+                    break
+            else:
+                self._depth -= 1
+
+        self._skeleton += buffer[position:scanned]
+        return scanned
+
+    @staticmethod
+    def _decode_objects(buffer: bytes, position: int) -> Optional[tuple[list, int]]:
+        """
+        Decodes every complete object from `position` onwards in a single call.
+
+        JSON values are prefix free, so the last candidate end that decodes is the
+        end of the last complete object. Candidates inside strings fail to decode
+        and are skipped.
+
+        Returns:
+            tuple | None: the objects and where they end, None if there are none yet
+        """
+        if buffer[position] != 0x7B:  # '{'
+            raise json.JSONDecodeError(
+                "Expected an object", buffer.decode(errors="replace"), position
+            )
+
+        candidates = [
+            match.start() + 1 for match in _OBJECT_END.finditer(buffer, position)
+        ]
+        for end in reversed(candidates):
+            try:
+                return loads(b"[" + buffer[position:end] + b"]"), end
+            except json.JSONDecodeError:
+                continue
+
+        return None
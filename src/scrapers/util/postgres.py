@@ -0,0 +1,14 @@
+import asyncpg
+
+from scrapers.util.config import config
+
+
+def create_pool() -> asyncpg.Pool:
+    return asyncpg.create_pool(
+        user=config.postgres_user,
+        password=config.postgres_password,
+        database=config.postgres_db,
+        host=config.postgres_host,
+        port=config.postgres_port,
+        command_timeout=60,
+    )
@@ -2,7 +2,14 @@ from typing import Optional
 
 
 class Show:
-    def __init__(self, url: str, name: str, status: str, imdbid: Optional[str] = None):
+    def __init__(
+        self,
+        url: str,
+        name: str,
+        status: str,
+        imdbid: Optional[str] = None,
+        removed_at: Optional[str] = None,
+    ):
         """
         _summary_
 
@@ -11,11 +18,14 @@ class Show:
             name (str): _description_
             status (str): _description_
             imdbid (str | None, optional): _description_. Defaults to None.
+            removed_at (str | None, optional): when the show disappeared from the
+                showlist. Removed shows are kept but not scraped. Defaults to None.
         """
         self.url = url
         self.name = name
         self.status = status
         self.imdbid = imdbid
+        self.removed_at = removed_at
 
     def __repr__(self):
-        return f"Show(url='{self.url}', name='{self.name}', status='{self.status}', imdbid='{self.imdbid}')"
+        return f"Show(url='{self.url}', name='{self.name}', status='{self.status}', imdbid='{self.imdbid}', removed_at='{self.removed_at}')"
@@ -7,9 +7,28 @@ import aiofiles
 import arrow
 from loguru import logger
 
+from scrapers.util.config import config
 from scrapers.util.show import Show
 
 
+class ShowListDiff:
+    """
+    The difference between a `ShowList` and a freshly scraped showlist.
+
+    Each list holds the freshly scraped `Show`, except `removed` which holds the
+    shows from the `ShowList` that are no longer listed. `rescan` holds the known
+    shows whose status changed, restored ones included, as they may have new
+    torrents since they were last scraped.
+    """
+
+    def __init__(self):
+        self.new: list[Show] = []
+        self.status_changed: list[Show] = []
+        self.restored: list[Show] = []
+        self.removed: list[Show] = []
+        self.rescan: list[Show] = []
+
+
 class ShowList:
     """
     A list of Show objects providing useful helper functions.
@@ -56,7 +75,7 @@ class ShowList:
 
     def __init__(self):
         self._shows: list[Show] = []
-        self._show_urls: set[str] = set()
+        self._shows_by_url: dict[str, Show] = {}
         self.timestamp: arrow.Arrow = arrow.utcnow()
         self._lock = asyncio.Lock()  # Create a lock for synchronization
 
@@ -66,9 +85,9 @@ class ShowList:
 
     async def add_show(self, show: Show) -> bool:
         async with self._lock:
-            if show.url not in self._show_urls:
+            if show.url not in self._shows_by_url:
                 self._shows.append(show)
-                self._show_urls.add(show.url)
+                self._shows_by_url[show.url] = show
                 return True
             else:
                 return False
@@ -77,22 +96,6 @@ class ShowList:
         async with self._lock:
             return self._shows[:]
 
-    async def update_show_status(self, url: str, status: str):
-        """
-        Returns:
-            bool: true if show updated
-        """
-        if url not in self._show_urls:
-            raise ValueError(f"Show with URL `{url}` not found in the list.")
-
-        for show in self._shows:
-            if show.url == url:
-                if show.status != status:
-                    async with self._lock:
-                        show.status = status
-                        return True
-                return False
-
     async def update_show_imdbid(self, url: str, imdbid: Optional[str] = None):
         """
         Returns:
@@ -102,25 +105,97 @@ class ShowList:
             # No point updating the IMDb if it's None
             return False
 
-        if url not in self._show_urls:
+        show = self._shows_by_url.get(url)
+        if show is None:
             raise ValueError(f"Show with URL `{url}` not found in the list.")
 
-        for show in self._shows:
-            if show.url == url:
-                if show.imdbid != imdbid:
-                    async with self._lock:
-                        show.imdbid = imdbid
-                        return True
-                return False
+        if show.imdbid != imdbid:
+            async with self._lock:
+                show.imdbid = imdbid
+                return True
+        return False
+
+    def diff(self, shows: list[Show]) -> ShowListDiff:
+        """
+        Compares a freshly scraped showlist against this one in a single pass.
+
+        Nothing is removed if more than `SHOWLIST_MAX_REMOVED_PERCENTAGE` of the
+        listed shows disappear at once, as that is far more likely to be a broken
+        or partial page than EZTV dropping that many shows.
+        """
+        diff = ShowListDiff()
+        seen_urls: set[str] = set()
+
+        for show in shows:
+            seen_urls.add(show.url)
+            existing = self._shows_by_url.get(show.url)
+
+            if existing is None:
+                diff.new.append(show)
+            elif existing.removed_at is not None:
+                diff.restored.append(show)
+                if existing.status != show.status:
+                    diff.rescan.append(show)
+            elif existing.status != show.status:
+                diff.status_changed.append(show)
+                diff.rescan.append(show)
+
+        listed = 0
+        removed = []
+        for url, show in self._shows_by_url.items():
+            if show.removed_at is None:
+                listed += 1
+                if url not in seen_urls:
+                    removed.append(show)
+
+        max_removed = listed * config.showlist_max_removed_percentage / 100
+        if len(removed) > max_removed:
+            logger.warning(
+                f"{len(removed)} of {listed} shows are missing from the showlist. This looks like a broken page, so no shows will be removed"
+            )
+        else:
+            diff.removed = removed
+
+        return diff
+
+    async def apply_diff(self, diff: ShowListDiff):
+        """
+        Applies a diff from `diff` under one lock. Removed shows are tombstoned
+        rather than deleted, so their IMDb IDs are kept if they ever come back.
+        """
+        removed_at = arrow.utcnow().for_json()
+
+        async with self._lock:
+            for show in diff.new:
+                if show.url not in self._shows_by_url:
+                    self._shows.append(show)
+                    self._shows_by_url[show.url] = show
+
+            for show in diff.status_changed + diff.restored:
+                existing = self._shows_by_url[show.url]
+                existing.status = show.status
+                existing.removed_at = None
+
+            for show in diff.removed:
+                show.removed_at = removed_at
 
     def get_shows_with_no_imdbid(self) -> list[Show]:
-        return [show for show in self._shows if show.imdbid is None]
+        return [
+            show
+            for show in self._shows
+            if show.imdbid is None and show.removed_at is None
+        ]
 
     def get_shows_with_imdbid(self) -> list[Show]:
-        return [show for show in self._shows if show.imdbid is not None]
+        return [
+            show
+            for show in self._shows
+            if show.imdbid is not None and show.removed_at is None
+        ]
 
     def search_by_url(self, url: str) -> list[Show]:
-        return [show for show in self._shows if show.url == url]
+        show = self._shows_by_url.get(url)
+        return [show] if show is not None else []
 
     def search_by_name(self, name: str) -> list[Show]:
         return [show for show in self._shows if show.name.lower() == name.lower()]
@@ -148,7 +223,7 @@ class ShowList:
             async with aiofiles.open(filename, "r", encoding="utf-8") as file:
                 data = json.loads(await file.read())
                 self._shows = [Show(**show_data) for show_data in data["shows"]]
-                self._show_urls = set(data["show_urls"])
+                self._shows_by_url = {show.url: show for show in self._shows}
                 self.timestamp = arrow.get(data["timestamp"])
         except json.JSONDecodeError:
             logger.debug(f"Error decoding JSON in `{filename}`")
@@ -168,7 +243,7 @@ class ShowList:
 
         data = {
             "shows": [show.__dict__ for show in self._shows],
-            "show_urls": list(self._show_urls),
+            "show_urls": list(self._shows_by_url),
             "timestamp": self.timestamp.for_json(),
         }
         logger.debug(f"Attempting to save the showlist to file `{filename}`")
@@ -0,0 +1,102 @@
+import asyncio
+
+import httpx
+import pytest
+
+from scrapers.scrapers.apibay import HD_CATEGORY, SD_CATEGORY, ApibaySource
+from scrapers.util.show import Show
+
+SHOW = Show("/shows/1/show/", "Show", "Airing: Mondays", imdbid="1520211")
+
+# What apibay returns when a search has no results
+NO_RESULTS = [
+    {
+        "id": "0",
+        "name": "No results returned",
+        "info_hash": "0000000000000000000000000000000000000000",
+        "leechers": "0",
+        "seeders": "0",
+        "size": "0",
+    }
+]
+
+
+def result(name: str, info_hash: str, seeders: int = 10) -> dict:
+    return {
+        "id": "70000001",
+        "name": name,
+        "info_hash": info_hash,
+        "leechers": "2",
+        "seeders": str(seeders),
+        "num_files": "1",
+        "size": "1500000000",
+        "username": "eztv",
+        "added": "1700000000",
+        "status": "vip",
+        "category": "208",
+        "imdb": "tt1520211",
+    }
+
+
+def get_torrents(responses: dict[int, object]) -> tuple[list[dict], list[dict]]:
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(dict(request.url.params))
+        return httpx.Response(200, json=responses[int(request.url.params["cat"])])
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await ApibaySource().get_torrents(SHOW, client)
+
+    return asyncio.run(run()), requests
+
+
+def test_searches_sd_and_hd():
+    torrents, requests = get_torrents(
+        {SD_CATEGORY: NO_RESULTS, HD_CATEGORY: NO_RESULTS}
+    )
+
+    assert sorted(request["cat"] for request in requests) == ["205", "208"]
+    assert all(request["q"] == "tt1520211" for request in requests)
+    assert torrents == []
+
+
+def test_normalises_and_deduplicates():
+    sd = [
+        result("Show S01E01 480p", "aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa"),
+        result("Show S01E02 480p", "bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb"),
+    ]
+    hd = [
+        # Listed in both categories, with a different case
+        result("Show S01E02 480p", "BBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBB"),
+        result("Show S01E01 1080p", "cccccccccccccccccccccccccccccccccccccccc", 42),
+    ]
+
+    torrents, _ = get_torrents({SD_CATEGORY: sd, HD_CATEGORY: hd})
+
+    assert sorted(torrent["info_hash"] for torrent in torrents) == [
+        "A" * 40,
+        "B" * 40,
+        "C" * 40,
+    ]
+    assert {
+        "title": "Show S01E01 1080p",
+        "info_hash": "C" * 40,
+        "size": 1500000000,
+        "seeders": 42,
+        "leechers": 2,
+    } in torrents
+
+
+def test_drops_no_results_placeholder():
+    hd = [result("Show S01E01 1080p", "cccccccccccccccccccccccccccccccccccccccc")]
+
+    torrents, _ = get_torrents({SD_CATEGORY: NO_RESULTS, HD_CATEGORY: hd})
+
+    assert [torrent["info_hash"] for torrent in torrents] == ["C" * 40]
+
+
+def test_rejects_unexpected_response():
+    with pytest.raises(TypeError):
+        get_torrents({SD_CATEGORY: {"error": "blocked"}, HD_CATEGORY: NO_RESULTS})
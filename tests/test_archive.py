@@ -0,0 +1,80 @@
+import asyncio
+import gzip
+
+import httpx
+
+from scrapers.util.archive import RecordingTransport, ReplayTransport, ResponseArchive
+
+URL = "https://eztvx.to/api/get-torrents?imdb_id=6048596"
+BODY = b'{"torrents_count": 1, "torrents": [{"title": "Show S01E01"}]}'
+
+
+def upstream(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/gzip":
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/html", "content-encoding": "gzip"},
+            content=gzip.compress(b"<html>showlist</html>"),
+        )
+    return httpx.Response(
+        200, headers={"content-type": "application/json"}, content=BODY
+    )
+
+
+async def record(path: str, *urls: str):
+    transport = RecordingTransport(
+        ResponseArchive(path), transport=httpx.MockTransport(upstream)
+    )
+    async with httpx.AsyncClient(transport=transport) as client:
+        for url in urls:
+            response = await client.get(url)
+            response.raise_for_status()
+
+
+async def replay(path: str, url: str) -> httpx.Response:
+    # A new archive, so everything is read back from disk
+    transport = ReplayTransport(ResponseArchive(path))
+    async with httpx.AsyncClient(transport=transport) as client:
+        response = await client.get(url)
+        await response.aread()
+        return response
+
+
+def test_round_trip(tmp_path):
+    asyncio.run(record(str(tmp_path), URL))
+
+    response = asyncio.run(replay(str(tmp_path), URL))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == BODY
+
+
+def test_round_trip_gzip(tmp_path):
+    url = "https://eztvx.to/gzip"
+    asyncio.run(record(str(tmp_path), url))
+
+    response = asyncio.run(replay(str(tmp_path), url))
+
+    # Stored as it came off the wire and decoded again on replay
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == b"<html>showlist</html>"
+
+
+def test_latest_response_wins(tmp_path):
+    archive = ResponseArchive(str(tmp_path))
+    asyncio.run(archive.append(URL, 200, [], b"old"))
+    asyncio.run(archive.append(URL, 500, [("x-attempt", "2")], b"new"))
+
+    status, headers, body = asyncio.run(ResponseArchive(str(tmp_path)).get(URL))
+
+    assert (status, headers, body) == (500, [("x-attempt", "2")], b"new")
+
+
+def test_unknown_url_is_404(tmp_path):
+    asyncio.run(record(str(tmp_path), URL))
+
+    response = asyncio.run(replay(str(tmp_path), "https://eztvx.to/showlist/"))
+
+    assert response.status_code == 404
+    assert response.content == b""
@@ -0,0 +1,138 @@
+import json
+import random
+
+import pytest
+
+from scrapers.util.jsonstream import TorrentStreamParser
+
+FIELDS = ("title", "hash", "size_bytes", "seeds", "peers")
+
+
+def make_response(count: int = 50, **extra) -> dict:
+    torrents = [
+        {
+            "id": i,
+            "hash": f"{i:040x}",
+            "filename": f"Show.S01E{i:02d}.720p.HDTV.x264-GRP[eztv].mkv",
+            "title": f"Show S01E{i:02d} 720p HDTV x264-GRP EZTV",
+            "magnet_url": f"magnet:?xt=urn:btih:{i:040x}&dn=Show&tr=udp%3A%2F%2Ftracker",
+            "size_bytes": str(i * 1000),
+            "seeds": i,
+            "peers": i % 7,
+        }
+        for i in range(count)
+    ]
+    return {"imdb_id": "1234", "torrents_count": count, **extra, "torrents": torrents}
+
+
+def parse(raw: bytes, chunks: list[bytes]) -> tuple[list[dict], dict]:
+    parser = TorrentStreamParser(FIELDS)
+    records = []
+    for chunk in chunks:
+        records.extend(parser.feed(chunk))
+    assert b"".join(chunks) == raw
+    return records, parser.close()
+
+
+def random_chunks(raw: bytes, seed: int) -> list[bytes]:
+    rng = random.Random(seed)
+    chunks = []
+    position = 0
+    while position < len(raw):
+        size = rng.randint(1, 64)
+        chunks.append(raw[position : position + size])
+        position += size
+    return chunks
+
+
+def expected(document: dict) -> tuple[list[dict], dict]:
+    records = [
+        {field: torrent[field] for field in FIELDS if field in torrent}
+        for torrent in document.get("torrents", [])
+    ]
+    metadata = dict(document)
+    if "torrents" in metadata:
+        metadata["torrents"] = []
+    return records, metadata
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_chunk_splits(seed):
+    document = make_response(limit=100, page=1)
+    raw = json.dumps(document).encode()
+
+    assert parse(raw, random_chunks(raw, seed)) == expected(document)
+
+
+def test_one_byte_chunks():
+    document = make_response(5)
+    raw = json.dumps(document, indent=2).encode()
+
+    assert parse(raw, [raw[i : i + 1] for i in range(len(raw))]) == expected(document)
+
+
+@pytest.mark.parametrize(
+    "title",
+    [
+        'Show "Quoted" S01E01',
+        "Show } S01E01",
+        "Show ] S01E01",
+        "Show }, {] S01E01",
+        'Show \\"}]\\ S01E01',
+        "Show é☃ S01E01",
+    ],
+)
+@pytest.mark.parametrize("seed", range(5))
+def test_special_characters_in_strings(title, seed):
+    document = make_response(10)
+    for torrent in document["torrents"]:
+        torrent["title"] = title
+        torrent["filename"] = title + " ]}"
+    document["note"] = 'torrents ["a"] {"b": "}"}'
+    raw = json.dumps(document).encode()
+
+    assert parse(raw, random_chunks(raw, seed)) == expected(document)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_nested_objects(seed):
+    document = make_response(10)
+    for torrent in document["torrents"]:
+        torrent["extra"] = {"a": {"b": [1, {"c": "}],"}], "d": {}}, "e": []}
+    # A nested `torrents` key is part of the metadata, not the array
+    document = {"meta": {"torrents": [{"title": "nested"}]}, **document}
+    raw = json.dumps(document).encode()
+
+    assert parse(raw, random_chunks(raw, seed)) == expected(document)
+
+
+def test_no_torrents_key():
+    document = {"imdb_id": "1234", "torrents_count": 0, "page": 1}
+    raw = json.dumps(document).encode()
+
+    assert parse(raw, random_chunks(raw, 0)) == ([], document)
+
+
+def test_empty_torrents():
+    document = make_response(0)
+    raw = json.dumps(document).encode()
+
+    assert parse(raw, random_chunks(raw, 0)) == ([], document)
+
+
+@pytest.mark.parametrize("cut", [1, 10, 50, 300, 2000, -2, -1])
+def test_truncated_body(cut):
+    raw = json.dumps(make_response(20)).encode()
+
+    parser = TorrentStreamParser(FIELDS)
+    parser.feed(raw[:cut])
+    with pytest.raises(json.JSONDecodeError):
+        parser.close()
+
+
+@pytest.mark.parametrize("body", [b"", b"<html><body>Bad Gateway</body></html>"])
+def test_not_json(body):
+    parser = TorrentStreamParser(FIELDS)
+    parser.feed(body)
+    with pytest.raises(json.JSONDecodeError):
+        parser.close()
@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+
+from scrapers.util.config import config
+from scrapers.util.show import Show
+from scrapers.util.showlist import ShowList
+
+STATUS = "Airing: Mondays"
+
+
+def scraped(count: int = 40) -> list[Show]:
+    return [Show(f"/shows/{i}/show-{i}/", f"Show {i}", STATUS) for i in range(count)]
+
+
+def make_showlist(count: int = 40) -> ShowList:
+    showlist = ShowList()
+    for i, show in enumerate(scraped(count)):
+        show.imdbid = f"{i:07d}"
+        asyncio.run(showlist.add_show(show))
+    return showlist
+
+
+def refresh(showlist: ShowList, shows: list[Show]):
+    diff = showlist.diff(shows)
+    asyncio.run(showlist.apply_diff(diff))
+    return diff
+
+
+def urls(shows: list[Show]) -> list[str]:
+    return [show.url for show in shows]
+
+
+@pytest.fixture(autouse=True)
+def max_removed_percentage(monkeypatch):
+    monkeypatch.setattr(config, "showlist_max_removed_percentage", 5)
+
+
+def test_unchanged():
+    showlist = make_showlist()
+
+    diff = refresh(showlist, scraped())
+
+    assert diff.new == []
+    assert diff.status_changed == []
+    assert diff.restored == []
+    assert diff.removed == []
+    assert diff.rescan == []
+
+
+def test_new_show():
+    showlist = make_showlist()
+    shows = scraped(41)
+
+    diff = refresh(showlist, shows)
+
+    assert urls(diff.new) == [shows[40].url]
+    assert diff.rescan == []
+    assert showlist.search_by_url(shows[40].url) == [shows[40]]
+    assert urls(showlist.get_shows_with_no_imdbid()) == [shows[40].url]
+
+
+def test_status_changed():
+    showlist = make_showlist()
+    shows = scraped()
+    shows[3].status = "Ended"
+
+    diff = refresh(showlist, shows)
+
+    assert urls(diff.status_changed) == [shows[3].url]
+    assert urls(diff.rescan) == [shows[3].url]
+    [show] = showlist.search_by_url(shows[3].url)
+    assert show.status == "Ended"
+    assert show.imdbid == "0000003"
+
+
+def test_removed_show_is_tombstoned():
+    showlist = make_showlist()
+    shows = scraped()
+    del shows[5:7]
+
+    diff = refresh(showlist, shows)
+
+    assert urls(diff.removed) == ["/shows/5/show-5/", "/shows/6/show-6/"]
+    assert diff.rescan == []
+    [show] = showlist.search_by_url("/shows/5/show-5/")
+    # Kept with its IMDb ID, but no longer scraped
+    assert show.removed_at is not None
+    assert show.imdbid == "0000005"
+    assert show not in showlist.get_shows_with_imdbid()
+    assert len(showlist) == 40
+
+
+def test_restored_show():
+    showlist = make_showlist()
+    shows = scraped()
+    refresh(showlist, shows[:39])
+
+    diff = refresh(showlist, scraped())
+
+    assert urls(diff.restored) == [shows[39].url]
+    assert diff.new == []
+    # Same status as before it was removed, nothing new to scrape
+    assert diff.rescan == []
+    [show] = showlist.search_by_url(shows[39].url)
+    assert show.removed_at is None
+    assert show.imdbid == "0000039"
+    assert show in showlist.get_shows_with_imdbid()
+
+
+def test_restored_show_with_new_status():
+    showlist = make_showlist()
+    refresh(showlist, scraped()[:39])
+    shows = scraped()
+    shows[39].status = "Ended"
+
+    diff = refresh(showlist, shows)
+
+    assert urls(diff.restored) == [shows[39].url]
+    assert diff.status_changed == []
+    assert urls(diff.rescan) == [shows[39].url]
+    assert showlist.search_by_url(shows[39].url)[0].status == "Ended"
+
+
+def test_partial_showlist_removes_nothing():
+    showlist = make_showlist()
+    shows = scraped()
+    shows[0].status = "Ended"
+
+    # 3 of 40 is over 5%
+    diff = refresh(showlist, shows[:37])
+
+    assert diff.removed == []
+    assert all(show.removed_at is None for show in showlist)
+    # The shows that were listed are still updated
+    assert urls(diff.rescan) == [shows[0].url]
+
+
+def test_empty_showlist_removes_nothing():
+    showlist = make_showlist()
+
+    diff = refresh(showlist, [])
+
+    assert diff.removed == []
+    assert len(showlist.get_shows_with_imdbid()) == 40
+
+
+def test_max_removed_percentage_is_configurable(monkeypatch):
+    monkeypatch.setattr(config, "showlist_max_removed_percentage", 10)
+    showlist = make_showlist()
+
+    diff = refresh(showlist, scraped()[:37])
+
+    assert len(diff.removed) == 3
+
+
+def test_guard_only_counts_listed_shows():
+    showlist = make_showlist()
+    refresh(showlist, scraped()[:38])
+
+    # 2 of the 38 shows still listed is over 5%, it would not be of all 40
+    diff = refresh(showlist, scraped()[:36])
+
+    assert diff.removed == []
+    assert len(showlist.get_shows_with_imdbid()) == 38